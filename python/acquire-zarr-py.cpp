@@ -344,6 +344,7 @@ class PyZarrStream
         dimension_names_.resize(dims.size());
 
         std::vector<ZarrDimensionProperties> dimension_props;
+        dimension_props.reserve(dims.size());
         for (auto i = 0; i < dims.size(); ++i) {
             const auto& dim = dims[i];
             dimension_names_[i] = dim.name();
@@ -376,6 +377,14 @@ class PyZarrStream
             throw py::error_already_set();
         }
 
+        // the stream reads the buffer in place, so it must be laid out
+        // contiguously in C order
+        if (!(image_data.flags() & py::array::c_style)) {
+            PyErr_SetString(PyExc_RuntimeError,
+                            "Cannot append non-C-contiguous data.");
+            throw py::error_already_set();
+        }
+
         auto buf = image_data.request();
         auto* ptr = (uint8_t*)buf.ptr;
 
@@ -696,7 +705,10 @@ PYBIND11_MODULE(acquire_zarr, m)
 
     py::class_<PyZarrStream>(m, "ZarrStream")
       .def(py::init<PyZarrStreamSettings>())
-      .def("append", &PyZarrStream::append)
+      .def("append",
+           &PyZarrStream::append,
+           "Append a C-contiguous array to the stream. The data are read "
+           "in place, so the array must stay alive until append returns.")
       .def("is_active", &PyZarrStream::is_active);
 
     m.def(
@@ -367,7 +367,11 @@ class ZarrStream:
         ...
 
     def append(self, arg0: numpy.ndarray) -> None:
-        ...
+        """Append a C-contiguous array to the stream.
+
+        The data are read in place, so the array must stay alive until append
+        returns.
+        """
 
     def is_active(self) -> bool:
         ...
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+
+import importlib
+import os
+
+import pytest
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--slow",
+        action="store_true",
+        default=False,
+        help="run tests marked as slow",
+    )
+
+
+def pytest_configure(config):
+    # zarr reads these when it is first imported, so set them before any
+    # test module is collected
+    os.environ.setdefault("ZARR_V3_EXPERIMENTAL_API", "1")
+    os.environ.setdefault("ZARR_V3_SHARDING", "1")
+
+    config.addinivalue_line(
+        "markers", "slow: slow test, skipped unless --slow is given"
+    )
+
+
+def pytest_sessionstart(session):
+    # S3 credentials may come from a .env file; read it once per session.
+    # Without python-dotenv, they can still come from the environment.
+    try:
+        import dotenv
+    except ImportError:
+        pass
+    else:
+        dotenv.load_dotenv()
+
+    # pay for loading the compiled modules up front, outside of any test; a
+    # missing module is left for the test modules that import it to report
+    for name in ("acquire_zarr", "s3fs", "zarr"):
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            pass
+
+    try:
+        from numcodecs import blosc
+    except ImportError:
+        return
+
+    # decompress chunks on every core when reading stores back
+    blosc.set_nthreads(os.cpu_count() or 1)
+    blosc.use_threads = True
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--slow"):
+        return
+
+    skip = pytest.mark.skip(reason="slow; pass --slow to run")
+    for item in items:
+        if "slow" in item.keywords:
+            item.add_marker(skip)
@@ -1,14 +1,17 @@
 #!/usr/bin/env python3
 
-import dotenv
-import json
+import itertools
+import math
 from pathlib import Path
 import os
 import shutil
-from typing import Optional
+import tempfile
+from typing import NamedTuple, Optional
 
-os.environ["ZARR_V3_EXPERIMENTAL_API"] = "1"
-os.environ["ZARR_V3_SHARDING"] = "1"
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
 
 import numpy as np
 import pytest
@@ -33,42 +36,130 @@ from acquire_zarr import (
 )
 
 
-@pytest.fixture(scope="function")
-def settings():
-    s = StreamSettings()
-    s.custom_metadata = json.dumps({"foo": "bar"})
-    s.dimensions.extend(
-        [
-            Dimension(
-                name="t",
-                kind=DimensionType.TIME,
-                array_size_px=0,
-                chunk_size_px=32,
-                shard_size_chunks=1,
-            ),
-            Dimension(
-                name="y",
-                kind=DimensionType.SPACE,
-                array_size_px=48,
-                chunk_size_px=16,
-                shard_size_chunks=1,
-            ),
-            Dimension(
-                name="x",
-                kind=DimensionType.SPACE,
-                array_size_px=64,
-                chunk_size_px=32,
-                shard_size_chunks=1,
-            ),
-        ]
+VERSIONS_AND_CODECS = [
+    (ZarrVersion.V2, None),
+    (ZarrVersion.V2, CompressionCodec.BLOSC_LZ4),
+    (ZarrVersion.V2, CompressionCodec.BLOSC_ZSTD),
+    (ZarrVersion.V3, None),
+    (ZarrVersion.V3, CompressionCodec.BLOSC_LZ4),
+    (ZarrVersion.V3, CompressionCodec.BLOSC_ZSTD),
+]
+
+
+def codec_marks(compression_codec: Optional[CompressionCodec]) -> list:
+    # at level 1 on these data, zstd exercises the same paths as lz4, so
+    # only run it when slow tests are requested
+    if compression_codec == CompressionCodec.BLOSC_ZSTD:
+        return [pytest.mark.slow]
+    return []
+
+
+# the one (version, codec) combination written to disk; the rest are written
+# to a RAM-backed filesystem where one is available
+DIRECTORY_BACKEND_COMBO = (ZarrVersion.V2, CompressionCodec.BLOSC_LZ4)
+
+SHM_ROOT = Path("/dev/shm")
+
+# shm directories are named <prefix><pid>-<random>, so leftovers from an
+# aborted run can be traced back to a process that no longer exists
+SHM_PREFIX = "acquire-zarr-tests-"
+
+
+def is_writable_tmpfs(path: Path) -> bool:
+    if not os.access(path, os.W_OK):
+        return False
+
+    try:
+        with open("/proc/mounts", "r") as fh:
+            mounts = [line.split() for line in fh]
+    except OSError:
+        return False
+
+    return any(
+        len(fields) > 2 and fields[1] == str(path) and fields[2] == "tmpfs"
+        for fields in mounts
     )
 
+
+SHM_AVAILABLE = is_writable_tmpfs(SHM_ROOT)
+
+
+def store_backend(
+    version: ZarrVersion, compression_codec: Optional[CompressionCodec]
+) -> str:
+    if (
+        version,
+        compression_codec,
+    ) == DIRECTORY_BACKEND_COMBO or not SHM_AVAILABLE:
+        return "directory"
+    return "shm"
+
+
+def process_exists(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # owned by another user
+    return True
+
+
+# each test seeds its own generator, so its data do not depend on which
+# other tests ran first
+RNG_SEED = 0
+
+CUSTOM_METADATA = '{"foo":"bar"}'
+
+DIMENSIONS = [
+    Dimension(
+        name="t",
+        kind=DimensionType.TIME,
+        array_size_px=0,
+        chunk_size_px=32,
+        shard_size_chunks=1,
+    ),
+    Dimension(
+        name="y",
+        kind=DimensionType.SPACE,
+        array_size_px=48,
+        chunk_size_px=16,
+        shard_size_chunks=1,
+    ),
+    Dimension(
+        name="x",
+        kind=DimensionType.SPACE,
+        array_size_px=64,
+        chunk_size_px=32,
+        shard_size_chunks=1,
+    ),
+]
+
+
+class WrittenStore(NamedTuple):
+    store_path: Path
+    version: ZarrVersion
+    compression_codec: Optional[CompressionCodec]
+    entropy: str
+    data: np.ndarray
+
+
+def make_settings() -> StreamSettings:
+    s = StreamSettings()
+    s.custom_metadata = CUSTOM_METADATA
+    # extend copies each Dimension into the settings
+    s.dimensions.extend(DIMENSIONS)
+
     return s
 
 
+@pytest.fixture(scope="function")
+def settings():
+    return make_settings()
+
+
 @pytest.fixture(scope="module")
 def s3_settings():
-    dotenv.load_dotenv()
     if (
         "ZARR_S3_ENDPOINT" not in os.environ
         or "ZARR_S3_BUCKET_NAME" not in os.environ
@@ -85,76 +176,167 @@ def s3_settings():
         )
 
 
+@pytest.fixture(scope="module")
+def s3_fs(s3_settings: Optional[S3Settings]):
+    if s3_settings is None:
+        return None
+
+    # this client only reads stores back; zarr fetches a store's chunks
+    # concurrently, which botocore's default pool of 10 connections throttles
+    return s3fs.S3FileSystem(
+        key=s3_settings.access_key_id,
+        secret=s3_settings.secret_access_key,
+        client_kwargs={"endpoint_url": s3_settings.endpoint},
+        config_kwargs={"max_pool_connections": 64},
+    )
+
+
+@pytest.fixture(scope="session")
+def shm_root():
+    if not SHM_AVAILABLE:
+        yield None
+        return
+
+    # pytest does not manage /dev/shm, so clear out stores left behind by
+    # runs that were killed before their finalizers ran
+    for entry in SHM_ROOT.glob(f"{SHM_PREFIX}*"):
+        pid = entry.name[len(SHM_PREFIX) :].split("-")[0]
+        if pid.isdigit() and not process_exists(int(pid)):
+            shutil.rmtree(entry, ignore_errors=True)
+
+    root = Path(
+        tempfile.mkdtemp(prefix=f"{SHM_PREFIX}{os.getpid()}-", dir=SHM_ROOT)
+    )
+    yield root
+    shutil.rmtree(root, ignore_errors=True)
+
+
 @pytest.fixture(scope="function")
-def store_path(tmp_path):
-    yield tmp_path
-    shutil.rmtree(tmp_path)
+def store_path(tmp_path_factory):
+    # pytest keeps only the most recent base temp dirs, so there is no need
+    # to remove the store ourselves
+    return tmp_path_factory.mktemp("store", numbered=True)
+
+
+def read_json(entry: os.DirEntry) -> dict:
+    return json_loads(Path(entry.path).read_bytes())
+
+
+def scan_dir(path: Path) -> dict:
+    # one directory listing instead of a stat() per existence check
+    with os.scandir(path) as it:
+        return {entry.name: entry for entry in it}
 
 
 def validate_v2_metadata(store_path: Path):
-    assert (store_path / ".zattrs").is_file()
-    with open(store_path / ".zattrs", "r") as fh:
-        data = json.load(fh)
-        axes = data["multiscales"][0]["axes"]
-        assert axes[0]["name"] == "t"
-        assert axes[0]["type"] == "time"
+    entries = scan_dir(store_path)
 
-        assert axes[1]["name"] == "y"
-        assert axes[1]["type"] == "space"
-        assert axes[1]["unit"] == "micrometer"
+    assert ".zattrs" in entries and entries[".zattrs"].is_file()
+    data = read_json(entries[".zattrs"])
+    axes = data["multiscales"][0]["axes"]
+    assert axes[0]["name"] == "t"
+    assert axes[0]["type"] == "time"
 
-        assert axes[2]["name"] == "x"
-        assert axes[2]["type"] == "space"
-        assert axes[2]["unit"] == "micrometer"
+    assert axes[1]["name"] == "y"
+    assert axes[1]["type"] == "space"
+    assert axes[1]["unit"] == "micrometer"
 
-    assert (store_path / ".zgroup").is_file()
-    with open(store_path / ".zgroup", "r") as fh:
-        data = json.load(fh)
-        assert data["zarr_format"] == 2
+    assert axes[2]["name"] == "x"
+    assert axes[2]["type"] == "space"
+    assert axes[2]["unit"] == "micrometer"
 
-    assert (store_path / "acquire.json").is_file()
-    with open(store_path / "acquire.json", "r") as fh:
-        data = json.load(fh)
-        assert data["foo"] == "bar"
+    assert ".zgroup" in entries and entries[".zgroup"].is_file()
+    data = read_json(entries[".zgroup"])
+    assert data["zarr_format"] == 2
 
-    assert (store_path / "0").is_dir()
+    assert "acquire.json" in entries and entries["acquire.json"].is_file()
+    data = read_json(entries["acquire.json"])
+    assert data["foo"] == "bar"
+
+    assert "0" in entries and entries["0"].is_dir()
 
 
 def validate_v3_metadata(store_path: Path):
-    assert (store_path / "zarr.json").is_file()
-    with open(store_path / "zarr.json", "r") as fh:
-        data = json.load(fh)
-        assert data["extensions"] == []
-        assert (
-            data["metadata_encoding"]
-            == "https://purl.org/zarr/spec/protocol/core/3.0"
-        )
-        assert (
-            data["zarr_format"]
-            == "https://purl.org/zarr/spec/protocol/core/3.0"
+    entries = scan_dir(store_path)
+
+    assert "zarr.json" in entries and entries["zarr.json"].is_file()
+    data = read_json(entries["zarr.json"])
+    assert data["extensions"] == []
+    assert (
+        data["metadata_encoding"]
+        == "https://purl.org/zarr/spec/protocol/core/3.0"
+    )
+    assert (
+        data["zarr_format"]
+        == "https://purl.org/zarr/spec/protocol/core/3.0"
+    )
+    assert data["metadata_key_suffix"] == ".json"
+
+    assert "meta" in entries and entries["meta"].is_dir()
+    meta_entries = scan_dir(store_path / "meta")
+
+    assert (
+        "root.group.json" in meta_entries
+        and meta_entries["root.group.json"].is_file()
+    )
+    data = read_json(meta_entries["root.group.json"])
+    axes = data["attributes"]["multiscales"][0]["axes"]
+    assert axes[0]["name"] == "t"
+    assert axes[0]["type"] == "time"
+
+    assert axes[1]["name"] == "y"
+    assert axes[1]["type"] == "space"
+    assert axes[1]["unit"] == "micrometer"
+
+    assert axes[2]["name"] == "x"
+    assert axes[2]["type"] == "space"
+    assert axes[2]["unit"] == "micrometer"
+
+    assert (
+        "acquire.json" in meta_entries
+        and meta_entries["acquire.json"].is_file()
+    )
+    data = read_json(meta_entries["acquire.json"])
+    assert data["foo"] == "bar"
+
+
+def stream_data(
+    settings: StreamSettings,
+    version: ZarrVersion,
+    compression_codec: Optional[CompressionCodec],
+    data: np.ndarray,
+):
+    settings.version = version
+    if compression_codec is not None:
+        settings.compression = CompressionSettings(
+            compressor=Compressor.BLOSC1,
+            codec=compression_codec,
+            level=1,
+            shuffle=1,
         )
-        assert data["metadata_key_suffix"] == ".json"
 
-    assert (store_path / "meta").is_dir()
-    assert (store_path / "meta" / "root.group.json").is_file()
-    with open(store_path / "meta" / "root.group.json", "r") as fh:
-        data = json.load(fh)
-        axes = data["attributes"]["multiscales"][0]["axes"]
-        assert axes[0]["name"] == "t"
-        assert axes[0]["type"] == "time"
+    stream = ZarrStream(settings)
+    assert stream
 
-        assert axes[1]["name"] == "y"
-        assert axes[1]["type"] == "space"
-        assert axes[1]["unit"] == "micrometer"
+    stream.append(data)
 
-        assert axes[2]["name"] == "x"
-        assert axes[2]["type"] == "space"
-        assert axes[2]["unit"] == "micrometer"
+    del stream  # close the stream, flush the data
 
-    assert (store_path / "meta" / "acquire.json").is_file()
-    with open(store_path / "meta" / "acquire.json", "r") as fh:
-        data = json.load(fh)
-        assert data["foo"] == "bar"
+
+def check_compressor(
+    array: zarr.Array, compression_codec: Optional[CompressionCodec]
+):
+    if compression_codec is not None:
+        cname = (
+            "lz4"
+            if compression_codec == CompressionCodec.BLOSC_LZ4
+            else "zstd"
+        )
+        assert array.compressor.cname == cname
+        assert array.compressor.clevel == 1
+        assert array.compressor.shuffle == blosc.SHUFFLE
+    else:
+        assert array.compressor is None
 
 
 def get_directory_store(version: ZarrVersion, store_path: str):
@@ -201,174 +383,192 @@ def test_create_stream(
         assert not (store_path / "meta" / "0.array.json").exists()
 
 
-@pytest.mark.parametrize(
-    (
-        "version",
-        "compression_codec",
-    ),
-    [
-        (
-            ZarrVersion.V2,
-            None,
-        ),
-        (
-            ZarrVersion.V2,
-            CompressionCodec.BLOSC_LZ4,
-        ),
-        (
-            ZarrVersion.V2,
-            CompressionCodec.BLOSC_ZSTD,
-        ),
-        (
-            ZarrVersion.V3,
-            None,
-        ),
-        (
-            ZarrVersion.V3,
-            CompressionCodec.BLOSC_LZ4,
-        ),
-        (
-            ZarrVersion.V3,
-            CompressionCodec.BLOSC_ZSTD,
-        ),
+@pytest.fixture(
+    scope="module",
+    params=[
+        pytest.param(p, marks=codec_marks(p[0][1]))
+        for p in itertools.product(
+            VERSIONS_AND_CODECS, [1, 4, 16], ["random", "structured"]
+        )
     ],
+    ids=lambda p: "-".join(
+        [
+            p[0][0].name,
+            p[0][1].name if p[0][1] is not None else "NONE",
+            f"{p[1]}chunks",
+            p[2],
+            store_backend(*p[0]),
+        ]
+    ),
 )
-def test_stream_data_to_filesystem(
-    settings: StreamSettings,
-    store_path: Path,
+def written_store(
     request: pytest.FixtureRequest,
-    version: ZarrVersion,
-    compression_codec: Optional[CompressionCodec],
+    tmp_path_factory: pytest.TempPathFactory,
+    shm_root: Optional[Path],
 ):
-    settings.store_path = str(store_path / f"{request.node.name}.zarr")
-    settings.version = version
-    if compression_codec is not None:
-        settings.compression = CompressionSettings(
-            compressor=Compressor.BLOSC1,
-            codec=compression_codec,
-            level=1,
-            shuffle=1,
-        )
+    # write each store once and share it among the tests that validate it
+    (version, compression_codec), n_chunks, entropy = request.param
 
-    stream = ZarrStream(settings)
-    assert stream
+    if store_backend(version, compression_codec) == "shm":
+        # remove each store as soon as its tests finish to bound RAM use
+        store_root = Path(tempfile.mkdtemp(dir=shm_root))
+        request.addfinalizer(lambda: shutil.rmtree(store_root))
+    else:
+        store_root = tmp_path_factory.mktemp("store")
 
-    data = np.random.randint(
-        0,
-        255,
-        (
-            settings.dimensions[0].chunk_size_px,
-            settings.dimensions[1].array_size_px,
-            settings.dimensions[2].array_size_px,
-        ),
-        dtype=np.uint8,
+    settings = make_settings()
+    settings.store_path = str(store_root / "test.zarr")
+
+    # append several chunks' worth of frames in a single call
+    shape = (
+        n_chunks * settings.dimensions[0].chunk_size_px,
+        settings.dimensions[1].array_size_px,
+        settings.dimensions[2].array_size_px,
+    )
+    if entropy == "random":
+        rng = np.random.default_rng(RNG_SEED)
+        data = rng.integers(0, 255, size=shape, dtype=np.uint8)
+    else:
+        # low-entropy ramp along x, exercising Blosc's fast path
+        data = np.broadcast_to(
+            np.arange(shape[-1], dtype=np.uint8), shape
+        ).copy()
+    stream_data(settings, version, compression_codec, data)
+
+    return WrittenStore(
+        store_path=Path(settings.store_path),
+        version=version,
+        compression_codec=compression_codec,
+        entropy=entropy,
+        data=data,
     )
-    stream.append(data)
 
-    del stream  # close the stream, flush the files
 
+def open_written_array(written_store: WrittenStore):
     group = zarr.open(
-        store=get_directory_store(version, settings.store_path), mode="r"
+        store=get_directory_store(
+            written_store.version, str(written_store.store_path)
+        ),
+        mode="r",
     )
-    data = group["0"]
+    return group["0"]
 
-    assert data.shape == (
-        settings.dimensions[0].chunk_size_px,
-        settings.dimensions[1].array_size_px,
-        settings.dimensions[2].array_size_px,
+
+BLOSC_MAX_OVERHEAD = 16
+
+SHARD_INDEX_ENTRY_BYTES = 2 * np.dtype(np.uint64).itemsize
+
+
+def written_chunk_bytes(written_store: WrittenStore) -> int:
+    if written_store.version == ZarrVersion.V2:
+        data_root = written_store.store_path / "0"
+    else:
+        data_root = written_store.store_path / "data" / "root" / "0"
+
+    return sum(
+        os.path.getsize(path)
+        for path in data_root.rglob("*")
+        if path.is_file() and not path.name.startswith(".")
     )
 
-    if compression_codec is not None:
-        cname = (
-            "lz4"
-            if compression_codec == CompressionCodec.BLOSC_LZ4
-            else "zstd"
-        )
-        assert data.compressor.cname == cname
-        assert data.compressor.clevel == 1
-        assert data.compressor.shuffle == blosc.SHUFFLE
+
+def test_stream_data_to_filesystem_metadata(written_store: WrittenStore):
+    store_path = written_store.store_path
+    if written_store.version == ZarrVersion.V2:
+        validate_v2_metadata(store_path)
+        assert (store_path / "0" / ".zarray").is_file()
     else:
-        assert data.compressor is None
+        validate_v3_metadata(store_path)
+        assert (store_path / "meta" / "root" / "0.array.json").is_file()
+
+
+def test_stream_data_to_filesystem_shape(written_store: WrittenStore):
+    data = open_written_array(written_store)
+
+    assert data.shape == written_store.data.shape
+
+
+def test_stream_data_to_filesystem_readback(written_store: WrittenStore):
+    data = open_written_array(written_store)
+
+    # read straight into a preallocated array rather than a fresh one
+    out = np.empty(written_store.data.shape, dtype=data.dtype)
+    data.get_basic_selection(Ellipsis, out=out)
+
+    np.testing.assert_array_equal(out, written_store.data)
+
+
+def test_stream_data_to_filesystem_compressor(written_store: WrittenStore):
+    data = open_written_array(written_store)
+
+    check_compressor(data, written_store.compression_codec)
+
+
+def test_stream_data_to_filesystem_chunk_bytes(written_store: WrittenStore):
+    nbytes = written_chunk_bytes(written_store)
+    raw_nbytes = written_store.data.nbytes
+
+    n_chunks = math.prod(
+        math.ceil(size / dim.chunk_size_px)
+        for size, dim in zip(written_store.data.shape, DIMENSIONS)
+    )
+    # Blosc adds at most a BLOSC_MAX_OVERHEAD (16 byte) header per chunk,
+    # and each V3 shard stores a 16-byte (offset, size) index entry per chunk
+    max_overhead = n_chunks * (BLOSC_MAX_OVERHEAD + SHARD_INDEX_ENTRY_BYTES)
+
+    if written_store.compression_codec is None:
+        assert raw_nbytes <= nbytes <= raw_nbytes + max_overhead
+    elif written_store.entropy == "structured":
+        # catch compression ratio regressions on highly compressible data
+        assert nbytes < raw_nbytes // 4
+    else:
+        # incompressible data must not grow beyond the codec's overhead
+        assert nbytes <= raw_nbytes + max_overhead
 
 
 @pytest.mark.parametrize(
-    (
-        "version",
-        "compression_codec",
-    ),
+    ("version", "compression_codec"),
     [
-        (
-            ZarrVersion.V2,
-            None,
-        ),
-        (
-            ZarrVersion.V2,
-            CompressionCodec.BLOSC_LZ4,
-        ),
-        (
-            ZarrVersion.V2,
-            CompressionCodec.BLOSC_ZSTD,
-        ),
-        (
-            ZarrVersion.V3,
-            None,
-        ),
-        (
-            ZarrVersion.V3,
-            CompressionCodec.BLOSC_LZ4,
-        ),
-        (
-            ZarrVersion.V3,
-            CompressionCodec.BLOSC_ZSTD,
-        ),
+        pytest.param(
+            version, compression_codec, marks=codec_marks(compression_codec)
+        )
+        for version, compression_codec in VERSIONS_AND_CODECS
     ],
 )
+@pytest.mark.parametrize("n_chunks", [1, 4, 16])
 def test_stream_data_to_s3(
     settings: StreamSettings,
     s3_settings: Optional[S3Settings],
+    s3_fs: Optional[s3fs.S3FileSystem],
     request: pytest.FixtureRequest,
     version: ZarrVersion,
     compression_codec: Optional[CompressionCodec],
+    n_chunks: int,
 ):
     if s3_settings is None:
         pytest.skip("S3 settings not set")
 
     settings.store_path = f"{request.node.name}.zarr".replace("[", "").replace("]", "")
-    settings.version = version
     settings.s3 = s3_settings
     settings.data_type = DataType.UINT16
-    if compression_codec is not None:
-        settings.compression = CompressionSettings(
-            compressor=Compressor.BLOSC1,
-            codec=compression_codec,
-            level=1,
-            shuffle=1,
-        )
 
-    stream = ZarrStream(settings)
-    assert stream
-
-    data = np.random.randint(
+    # several chunks per append, so the stream has many parts in flight at
+    # once across its S3 connection pool
+    rng = np.random.default_rng(RNG_SEED)
+    data = rng.integers(
         -255,
         255,
         (
-            settings.dimensions[0].chunk_size_px,
+            n_chunks * settings.dimensions[0].chunk_size_px,
             settings.dimensions[1].array_size_px,
             settings.dimensions[2].array_size_px,
         ),
         dtype=np.int16,
     )
-    stream.append(data)
+    stream_data(settings, version, compression_codec, data)
 
-    del stream  # close the stream, flush the data
-
-    s3 = s3fs.S3FileSystem(
-        key=settings.s3.access_key_id,
-        secret=settings.s3.secret_access_key,
-        client_kwargs={"endpoint_url": settings.s3.endpoint},
-    )
     store = s3fs.S3Map(
-        root=f"{s3_settings.bucket_name}/{settings.store_path}", s3=s3
+        root=f"{s3_settings.bucket_name}/{settings.store_path}", s3=s3_fs
     )
     cache = (
         zarr.LRUStoreCache(store, max_size=2**28)
@@ -380,25 +580,62 @@ def test_stream_data_to_s3(
     data = group["0"]
 
     assert data.shape == (
-        settings.dimensions[0].chunk_size_px,
+        n_chunks * settings.dimensions[0].chunk_size_px,
         settings.dimensions[1].array_size_px,
         settings.dimensions[2].array_size_px,
     )
 
-    if compression_codec is not None:
-        cname = (
-            "lz4"
-            if compression_codec == CompressionCodec.BLOSC_LZ4
-            else "zstd"
-        )
-        assert data.compressor.cname == cname
-        assert data.compressor.clevel == 1
-        assert data.compressor.shuffle == blosc.SHUFFLE
-    else:
-        assert data.compressor is None
+    check_compressor(data, compression_codec)
 
     # cleanup
-    s3.rm(store.root, recursive=True)
+    s3_fs.rm(store.root, recursive=True)
+
+
+def test_stream_data_from_memmap(
+    settings: StreamSettings,
+    store_path: Path,
+    request: pytest.FixtureRequest,
+):
+    settings.store_path = str(store_path / f"{request.node.name}.zarr")
+    stream = ZarrStream(settings)
+    assert stream
+
+    # the binding reads a memory-mapped array in place, like any ndarray
+    shape = (
+        settings.dimensions[0].chunk_size_px,
+        settings.dimensions[1].array_size_px,
+        settings.dimensions[2].array_size_px,
+    )
+    data = np.memmap(
+        store_path / "scratch.bin", mode="w+", dtype=np.uint8, shape=shape
+    )
+    rng = np.random.default_rng(RNG_SEED)
+    data[...] = rng.integers(0, 255, size=data.shape, dtype=data.dtype)
+    stream.append(data)
+
+    del stream  # close the stream, flush the files
+
+    group = zarr.open(
+        store=get_directory_store(ZarrVersion.V2, settings.store_path),
+        mode="r",
+    )
+    np.testing.assert_array_equal(group["0"][:], data)
+
+
+def test_append_non_contiguous_data_fails(
+    settings: StreamSettings,
+    store_path: Path,
+    request: pytest.FixtureRequest,
+):
+    settings.store_path = str(store_path / f"{request.node.name}.zarr")
+    stream = ZarrStream(settings)
+    assert stream
+
+    data = np.zeros((32, 48, 64), dtype=np.uint8)[:, :, ::2]
+    assert not data.flags.c_contiguous
+
+    with pytest.raises(RuntimeError):
+        stream.append(data)
 
 
 @pytest.mark.parametrize(